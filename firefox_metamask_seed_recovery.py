@@ -1,6 +1,5 @@
 #!/bin/python3
 import sqlite3
-import snappy
 import io
 import sys
 import glob
@@ -10,6 +9,12 @@ import os
 import json
 import configparser
 import platform
+import concurrent.futures
+
+try:
+	import cramjam
+except ImportError:
+	raise ImportError("Failed to import cramjam. Is it installed?") from None
 
 
 
@@ -24,6 +29,7 @@ import platform
 #     and many helpful comments were copied as-is.
 #   – Python source code by Alexander Schlarb, 2020.
 
+import codecs
 import collections
 import datetime
 import enum
@@ -48,6 +54,10 @@ class JSInt32(int):
 			raise TypeError("JavaScript integers are signed 32-bit values")
 
 
+# Shared instances for the most common integer values (see `Reader.start_read`)
+_SMALL_INTS = [JSInt32(i) for i in range(-128, 256)]
+
+
 class JSBigInt(int):
 	"""Type to represent the arbitrary precision JavaScript “BigInt” type"""
 	pass
@@ -91,6 +101,8 @@ class JSBooleanObj(int):
 
 
 class _HashableContainer:
+	__slots__ = ("inner",)
+	
 	inner: object
 	
 	def __init__(self, inner: object):
@@ -106,10 +118,19 @@ class _HashableContainer:
 		return str(self.inner)
 
 
+# Types whose instances are known to be hashable (`tuple` is not included, as
+# it may contain unhashable items)
+_HASHABLE_TYPES = (str, int, float, bytes, frozenset, type(None))
+
+
 class JSMapObj(collections.UserDict):
 	"""JavaScript compatible Map object that allows arbitrary values for the key."""
 	@staticmethod
 	def key_to_hashable(key: object) -> collections.abc.Hashable:
+		# Fast path for the usual key types, which are always hashable
+		if isinstance(key, _HASHABLE_TYPES):
+			return key
+		
 		try:
 			hash(key)
 		except TypeError:
@@ -152,23 +173,23 @@ class JSRegExpObj:
 	@classmethod
 	def from_re(cls, regex: re.Pattern) -> 'JSRegExpObj':
 		flags = RegExpFlag.GLOBAL
-		if regex.flags | re.DOTALL:
+		if regex.flags & re.DOTALL:
 			pass  # Not supported in current (2020-01) version of SpiderMonkey
-		if regex.flags | re.IGNORECASE:
+		if regex.flags & re.IGNORECASE:
 			flags |= RegExpFlag.IGNORE_CASE
-		if regex.flags | re.MULTILINE:
+		if regex.flags & re.MULTILINE:
 			flags |= RegExpFlag.MULTILINE
 		return cls(regex.pattern, flags)
 	
 	def to_re(self) -> re.Pattern:
 		flags = 0
-		if self.flags | RegExpFlag.IGNORE_CASE:
+		if self.flags & _F_IGNORE_CASE:
 			flags |= re.IGNORECASE
-		if self.flags | RegExpFlag.GLOBAL:
+		if self.flags & _F_GLOBAL:
 			pass  # Matching type depends on matching function used in Python
-		if self.flags | RegExpFlag.MULTILINE:
+		if self.flags & _F_MULTILINE:
 			flags |= re.MULTILINE
-		if self.flags | RegExpFlag.UNICODE:
+		if self.flags & _F_UNICODE:
 			pass  #XXX
 		return re.compile(self.expr, flags)
 
@@ -262,6 +283,16 @@ class RegExpFlag(enum.IntFlag):
 	UNICODE     = 0b01000
 
 
+# Plain `int` copies of the enum values above (`_T_NULL`, `_F_GLOBAL`, …) for
+# use in the parser hot paths, where comparing against enum members is
+# noticeably slower. `__members__` is used so that aliases are included too.
+for _name, _member in DataType.__members__.items():
+	globals()[f"_T_{_name}"] = int(_member)
+for _name, _member in RegExpFlag.__members__.items():
+	globals()[f"_F_{_name}"] = int(_member)
+del _name, _member
+
+
 class Scope(enum.IntEnum):
 	SAME_PROCESS                   = 1
 	DIFFERENT_PROCESS              = 2
@@ -270,86 +301,145 @@ class Scope(enum.IntEnum):
 	UNKNOWN_DESTINATION            = 5
 
 
+_S_Q = struct.Struct("<q")
+_S_D = struct.Struct("<d")
+# Little-endian (low, high) halves of a 64-bit word – the high half is the tag
+_S_PAIR = struct.Struct("<II")
+
+
 class _Input:
-	stream: io.BufferedReader
+	buf: typing.Union[bytes, bytearray, memoryview]
+	pos: int
 	
-	def __init__(self, stream: io.BufferedReader):
-		self.stream = stream
+	def __init__(self, data: typing.Union[bytes, bytearray, memoryview, io.BufferedIOBase]):
+		# Decode each 8-byte word straight from memory, slurping the entire
+		# (already decompressed) input up-front if given a stream
+		if isinstance(data, (bytes, bytearray, memoryview)):
+			self.buf = data
+		else:
+			self.buf = data.read()
+		self.pos = 0
 	
 	def peek(self) -> int:
 		try:
-			return struct.unpack_from("<q", self.stream.peek(8))[0]
+			return _S_Q.unpack_from(self.buf, self.pos)[0]
 		except struct.error:
 			raise EOFError() from None
 	
 	def peek_pair(self) -> (int, int):
-		v = self.peek()
-		return ((v >> 32) & 0xFFFFFFFF, (v >> 0) & 0xFFFFFFFF)
-	
-	def drop_padding(self, read_length):
-		length = 8 - ((read_length - 1) % 8) - 1
-		result = self.stream.read(length)
-		if len(result) < length:
-			raise EOFError()
+		try:
+			data, tag = _S_PAIR.unpack_from(self.buf, self.pos)
+		except struct.error:
+			raise EOFError() from None
+		return tag, data
 	
-	def read(self, fmt="q"):
+	def read(self) -> int:
 		try:
-			return struct.unpack("<" + fmt, self.stream.read(8))[0]
+			v = _S_Q.unpack_from(self.buf, self.pos)[0]
 		except struct.error:
 			raise EOFError() from None
+		self.pos += 8
+		return v
 	
-	def read_bytes(self, length: int) -> bytes:
-		result = self.stream.read(length)
-		if len(result) < length:
+	def _skip(self, length: int) -> int:
+		# Data is always padded to the next multiple of 8 bytes
+		p = self.pos
+		if p + ((length + 7) & ~7) > len(self.buf):
 			raise EOFError()
-		self.drop_padding(length)
-		return result
+		self.pos = p + ((length + 7) & ~7)
+		return p
+	
+	def read_bytes(self, length: int) -> bytes:
+		p = self._skip(length)
+		return bytes(self.buf[p:p+length])
+	
+	def read_latin1(self, length: int) -> str:
+		p = self._skip(length)
+		return codecs.latin_1_decode(self.buf[p:p+length])[0]
+	
+	def read_utf16le(self, length: int) -> str:
+		# Calling the codec function directly skips the codec registry lookup
+		# done by every `bytes.decode("utf-16le")`, which dominates the cost of
+		# decoding the short strings found in real data
+		p = self._skip(length)
+		return codecs.utf_16_le_decode(self.buf[p:p+length], None, True)[0]
 	
 	def read_pair(self) -> (int, int):
-		v = self.read()
-		return ((v >> 32) & 0xFFFFFFFF, (v >> 0) & 0xFFFFFFFF)
+		try:
+			data, tag = _S_PAIR.unpack_from(self.buf, self.pos)
+		except struct.error:
+			raise EOFError() from None
+		self.pos += 8
+		return tag, data
 	
 	def read_double(self) -> float:
-		return self.read("d")
+		try:
+			v = _S_D.unpack_from(self.buf, self.pos)[0]
+		except struct.error:
+			raise EOFError() from None
+		self.pos += 8
+		return v
+
+
+# Kinds of container objects on the `Reader.objs` stack, tracked alongside it in
+# `Reader.obj_kinds` so that the main loop does not need `isinstance` checks
+_KIND_LIST  = 0
+_KIND_DICT  = 1
+_KIND_MAP   = 2
+_KIND_SET   = 3
+_KIND_FRAME = 4
 
 
 class Reader:
-	all_objs: typing.List[typing.Union[list, dict]]
-	compat:   bool
-	input:    _Input
-	objs:     typing.List[typing.Union[list, dict]]
+	all_objs:  typing.List[typing.Union[list, dict]]
+	compat:    bool
+	input:     _Input
+	objs:      typing.List[typing.Union[list, dict]]
+	obj_kinds: typing.List[int]
 	
 	
-	def __init__(self, stream: io.BufferedReader):
-		self.input = _Input(stream)
+	def __init__(self, data: typing.Union[bytes, bytearray, memoryview, io.BufferedIOBase]):
+		self.input = _Input(data)
 		
-		self.all_objs = []
-		self.compat   = False
-		self.objs     = []
+		self.all_objs  = []
+		self.compat    = False
+		self.objs      = []
+		self.obj_kinds = []
 	
 	
 	def read(self):
 		self.read_header()
 		self.read_transfer_map()
 		
+		# Bind everything used by the loop below to locals, as this loop runs
+		# once for every value in the (possibly very large) object tree
+		objs       = self.objs
+		obj_kinds  = self.obj_kinds
+		all_objs   = self.all_objs
+		start_read = self.start_read
+		peek_pair  = self.input.peek_pair
+		read_pair  = self.input.read_pair
+		
 		# Start out by reading in the main object and pushing it onto the 'objs'
 		# stack. The data related to this object and its descendants extends
 		# from here to the SCTAG_END_OF_KEYS at the end of the stream.
-		add_obj, result = self.start_read()
+		add_obj, result = start_read()
 		if add_obj:
-			self.all_objs.append(result)
+			all_objs.append(result)
 		
 		# Stop when the stack shows that all objects have been read.
-		while len(self.objs) > 0:
+		while objs:
 			# What happens depends on the top obj on the objs stack.
-			obj = self.objs[-1]
+			obj  = objs[-1]
+			kind = obj_kinds[-1]
 			
-			tag, data = self.input.peek_pair()
-			if tag == DataType.END_OF_KEYS:
+			tag, data = peek_pair()
+			if tag == _T_END_OF_KEYS:
 				# Pop the current obj off the stack, since we are done with it
 				# and its children.
-				self.input.read_pair()
-				self.objs.pop()
+				read_pair()
+				objs.pop()
+				obj_kinds.pop()
 				continue
 			
 			# The input stream contains a sequence of "child" values, whose
@@ -365,39 +455,40 @@ class Reader:
 			# Note that this means the ordering in the stream is a little funky
 			# for things like Map. See the comment above startWrite() for an
 			# example.
-			add_obj, key = self.start_read()
+			add_obj, key = start_read()
 			if add_obj:
-				self.all_objs.append(key)
+				all_objs.append(key)
 			
 			# Backwards compatibility: Null formerly indicated the end of
 			# object properties.
-			if key is None and not isinstance(obj, (JSMapObj, JSSetObj, JSSavedFrame)):
-				self.objs.pop()
+			if key is None and kind <= _KIND_DICT:
+				objs.pop()
+				obj_kinds.pop()
 				continue
 			
 			# Set object: the values between obj header (from startRead()) and
 			# DataType.END_OF_KEYS are interpreted as values to add to the set.
-			if isinstance(obj, JSSetObj):
+			if kind == _KIND_SET:
 				obj.add(key)
 			
-			if isinstance(obj, JSSavedFrame):
+			if kind == _KIND_FRAME:
 				raise NotImplementedError()  #XXX: TODO
 			
 			# Everything else uses a series of key, value, key, value, … objects.
-			add_obj, val = self.start_read()
+			add_obj, val = start_read()
 			if add_obj:
-				self.all_objs.append(val)
+				all_objs.append(val)
 			
 			# For a Map, store those <key,value> pairs in the contained map
 			# data structure.
-			if isinstance(obj, JSMapObj):
-				obj[key] = value
+			if kind == _KIND_MAP:
+				obj[key] = val
 			else:
 				if not isinstance(key, (str, int)):
 					#continue
 					raise ParseError("JavaScript object key must be a string or integer")
 				
-				if isinstance(obj, list):
+				if kind == _KIND_LIST:
 					# Ignore object properties on array
 					if not isinstance(key, int) or key < 0:
 						continue
@@ -408,7 +499,7 @@ class Reader:
 				
 				obj[key] = val
 		
-		self.all_objs.clear()
+		all_objs.clear()
 		
 		return result
 	
@@ -417,7 +508,7 @@ class Reader:
 		tag, data = self.input.peek_pair()
 		
 		scope: int
-		if tag == DataType.HEADER:
+		if tag == _T_HEADER:
 			tag, data = self.input.read_pair()
 			
 			if data == 0:
@@ -439,7 +530,7 @@ class Reader:
 	
 	def read_transfer_map(self) -> None:
 		tag, data = self.input.peek_pair()
-		if tag == DataType.TRANSFER_MAP_HEADER:
+		if tag == _T_TRANSFER_MAP_HEADER:
 			raise InvalidHeaderError("Transfer maps are not allowed for persistent data")
 	
 	
@@ -454,117 +545,179 @@ class Reader:
 		latin1 = bool(info & 0x80000000)
 		
 		if latin1:
-			return self.input.read_bytes(length).decode("latin-1")
+			return self.input.read_latin1(length)
 		else:
-			return self.input.read_bytes(length * 2).decode("utf-16le")
+			return self.input.read_utf16le(length * 2)
 	
 	
 	def start_read(self):
 		tag, data = self.input.read_pair()
 		
-		if tag == DataType.NULL:
+		# The most common tags in real-world data are handled inline, everything
+		# else goes through the `_DISPATCH` table below
+		if tag == _T_NULL:
 			return False, None
-		
-		elif tag == DataType.UNDEFINED:
+		elif tag == _T_UNDEFINED:
 			return False, NotImplemented
-		
-		elif tag == DataType.INT32:
+		elif tag == _T_INT32:
 			if data > 0x7FFFFFFF:
-				data -= 0x80000000
-			return False, JSInt32(data)
-		
-		elif tag == DataType.BOOLEAN:
+				data -= 0x100000000
+			# Small values share preallocated instances, anything else is returned
+			# as a plain `int` (the range is already guaranteed by the encoding)
+			if -128 <= data < 256:
+				return False, _SMALL_INTS[data + 128]
+			return False, data
+		elif tag == _T_BOOLEAN:
 			return False, bool(data)
-		elif tag == DataType.BOOLEAN_OBJECT:
-			return True, JSBooleanObj(data)
-		
-		elif tag == DataType.STRING:
-			return False, self.read_string(data)
-		elif tag == DataType.STRING_OBJECT:
-			return True, JSStringObj(self.read_string(data))
-		
-		elif tag == DataType.NUMBER_OBJECT:
-			return True, JSNumberObj(self.input.read_double())
-		
-		elif tag == DataType.BIGINT:
-			return False, self.read_bigint()
-		elif tag == DataType.BIGINT_OBJECT:
-			return True, JSBigIntObj(self.read_bigint())
-		
-		elif tag == DataType.DATE_OBJECT:
-			# These timestamps are always UTC
-			return True, datetime.datetime.fromtimestamp(self.input.read_double(),
-			                                             datetime.timezone.utc)
-		
-		elif tag == DataType.REGEXP_OBJECT:
-			flags = RegExpFlag(data)
-			
-			tag2, data2 = self.input.read_pair()
-			if tag2 != DataType.STRING:
-				#return False, False
-				raise ParseError("RegExp type must be followed by string")
-			
-			return True, JSRegExpObj(flags, self.read_string(data2))
 		
-		elif tag == DataType.ARRAY_OBJECT:
-			obj = []
-			self.objs.append(obj)
-			return True, obj
-		elif tag == DataType.OBJECT_OBJECT:
-			obj = {}
-			self.objs.append(obj)
-			return True, obj
-		
-		elif tag == DataType.BACK_REFERENCE_OBJECT:
-			try:
-				return False, self.all_objs[data]
-			except IndexError:
-				#return False, False
-				raise ParseError("Object backreference to non-existing object") from None
-		
-		elif tag == DataType.ARRAY_BUFFER_OBJECT:
-			return True, self.read_array_buffer(data)  #XXX: TODO
-		
-		elif tag == DataType.SHARED_ARRAY_BUFFER_OBJECT:
-			return True, self.read_shared_array_buffer(data)  #XXX: TODO
-		
-		elif tag == DataType.SHARED_WASM_MEMORY_OBJECT:
-			return True, self.read_shared_wasm_memory(data)  #XXX: TODO
-		
-		elif tag == DataType.TYPED_ARRAY_OBJECT:
-			array_type = self.input.read()
-			return False, self.read_typed_array(array_type, data)  #XXX: TODO
-		
-		elif tag == DataType.DATA_VIEW_OBJECT:
-			return False, self.read_data_view(data)  #XXX: TODO
-		
-		elif tag == DataType.MAP_OBJECT:
-			obj = JSMapObj()
-			self.objs.append(obj)
-			return True, obj
-		
-		elif tag == DataType.SET_OBJECT:
-			obj = JSSetObj()
-			self.objs.append(obj)
-			return True, obj
-		
-		elif tag == DataType.SAVED_FRAME_OBJECT:
-			obj = self.read_saved_frame(data)  #XXX: TODO
-			self.objs.append(obj)
-			return True, obj
-		
-		elif tag < int(DataType.FLOAT_MAX):
+		handler = _DISPATCH.get(tag)
+		if handler is not None:
+			return handler(self, data)
+		return self._start_read_slow(tag, data)
+	
+	
+	def _start_read_slow(self, tag: int, data: int):
+		if tag < _T_FLOAT_MAX:
 			# Reassemble double floating point value
 			return False, struct.unpack("=d", struct.pack("=q", (tag << 32) | data))[0]
 		
-		elif DataType.TYPED_ARRAY_V1_MIN <= tag <= DataType.TYPED_ARRAY_V1_MAX:
-			return False, self.read_typed_array(tag - DataType.TYPED_ARRAY_V1_MIN, data)
+		elif _T_TYPED_ARRAY_V1_MIN <= tag <= _T_TYPED_ARRAY_V1_MAX:
+			return False, self.read_typed_array(tag - _T_TYPED_ARRAY_V1_MIN, data)
 		
 		else:
 			#return False, False
 			raise ParseError("Unsupported type")
 
 
+def _read_boolean_object(reader: Reader, data: int):
+	return True, JSBooleanObj(data)
+
+
+def _read_string(reader: Reader, data: int):
+	return False, reader.read_string(data)
+
+
+def _read_string_object(reader: Reader, data: int):
+	return True, JSStringObj(reader.read_string(data))
+
+
+def _read_number_object(reader: Reader, data: int):
+	return True, JSNumberObj(reader.input.read_double())
+
+
+def _read_bigint(reader: Reader, data: int):
+	return False, reader.read_bigint()
+
+
+def _read_bigint_object(reader: Reader, data: int):
+	return True, JSBigIntObj(reader.read_bigint())
+
+
+def _read_date_object(reader: Reader, data: int):
+	# These timestamps are always UTC
+	return True, datetime.datetime.fromtimestamp(reader.input.read_double(),
+	                                             datetime.timezone.utc)
+
+
+def _read_regexp_object(reader: Reader, data: int):
+	flags = RegExpFlag(data)
+	
+	tag2, data2 = reader.input.read_pair()
+	if tag2 != _T_STRING:
+		#return False, False
+		raise ParseError("RegExp type must be followed by string")
+	
+	return True, JSRegExpObj(flags, reader.read_string(data2))
+
+
+def _read_array_object(reader: Reader, data: int):
+	obj = []
+	reader.objs.append(obj)
+	reader.obj_kinds.append(_KIND_LIST)
+	return True, obj
+
+
+def _read_object_object(reader: Reader, data: int):
+	obj = {}
+	reader.objs.append(obj)
+	reader.obj_kinds.append(_KIND_DICT)
+	return True, obj
+
+
+def _read_back_reference_object(reader: Reader, data: int):
+	try:
+		return False, reader.all_objs[data]
+	except IndexError:
+		#return False, False
+		raise ParseError("Object backreference to non-existing object") from None
+
+
+def _read_array_buffer_object(reader: Reader, data: int):
+	return True, reader.read_array_buffer(data)  #XXX: TODO
+
+
+def _read_shared_array_buffer_object(reader: Reader, data: int):
+	return True, reader.read_shared_array_buffer(data)  #XXX: TODO
+
+
+def _read_shared_wasm_memory_object(reader: Reader, data: int):
+	return True, reader.read_shared_wasm_memory(data)  #XXX: TODO
+
+
+def _read_typed_array_object(reader: Reader, data: int):
+	array_type = reader.input.read()
+	return False, reader.read_typed_array(array_type, data)  #XXX: TODO
+
+
+def _read_data_view_object(reader: Reader, data: int):
+	return False, reader.read_data_view(data)  #XXX: TODO
+
+
+def _read_map_object(reader: Reader, data: int):
+	obj = JSMapObj()
+	reader.objs.append(obj)
+	reader.obj_kinds.append(_KIND_MAP)
+	return True, obj
+
+
+def _read_set_object(reader: Reader, data: int):
+	obj = JSSetObj()
+	reader.objs.append(obj)
+	reader.obj_kinds.append(_KIND_SET)
+	return True, obj
+
+
+def _read_saved_frame_object(reader: Reader, data: int):
+	obj = reader.read_saved_frame(data)  #XXX: TODO
+	reader.objs.append(obj)
+	reader.obj_kinds.append(_KIND_FRAME)
+	return True, obj
+
+
+# Tag → handler table used by `Reader.start_read`, keyed by plain `int` values
+# to avoid going through `DataType` on every lookup
+_DISPATCH: typing.Dict[int, typing.Callable[[Reader, int], typing.Tuple[bool, object]]] = {
+	_T_BOOLEAN_OBJECT:             _read_boolean_object,
+	_T_STRING:                     _read_string,
+	_T_STRING_OBJECT:              _read_string_object,
+	_T_NUMBER_OBJECT:              _read_number_object,
+	_T_BIGINT:                     _read_bigint,
+	_T_BIGINT_OBJECT:              _read_bigint_object,
+	_T_DATE_OBJECT:                _read_date_object,
+	_T_REGEXP_OBJECT:              _read_regexp_object,
+	_T_ARRAY_OBJECT:               _read_array_object,
+	_T_OBJECT_OBJECT:              _read_object_object,
+	_T_BACK_REFERENCE_OBJECT:      _read_back_reference_object,
+	_T_ARRAY_BUFFER_OBJECT:        _read_array_buffer_object,
+	_T_SHARED_ARRAY_BUFFER_OBJECT: _read_shared_array_buffer_object,
+	_T_SHARED_WASM_MEMORY_OBJECT:  _read_shared_wasm_memory_object,
+	_T_TYPED_ARRAY_OBJECT:         _read_typed_array_object,
+	_T_DATA_VIEW_OBJECT:           _read_data_view_object,
+	_T_MAP_OBJECT:                 _read_map_object,
+	_T_SET_OBJECT:                 _read_set_object,
+	_T_SAVED_FRAME_OBJECT:         _read_saved_frame_object,
+}
+
 
 
 
@@ -592,8 +745,6 @@ import collections.abc as cabc
 import io
 import typing as ty
 
-import cramjam
-
 
 def decompress_raw(data: bytes) -> bytes:
 	"""Decompress a raw Snappy chunk without any framing"""
@@ -702,7 +853,10 @@ class Decompressor(io.BufferedIOBase):
 		else:
 			end = min(start + size, self._buf_len)
 		
-		result: bytes = bytes(self._buf[start:end])
+		# Copy straight out of the buffer (slicing the `bytearray` itself would
+		# copy twice)
+		with memoryview(self._buf) as view:
+			result: bytes = bytes(view[start:end])
 		if end < self._buf_len:
 			self._buf_pos = end
 		else:
@@ -711,14 +865,18 @@ class Decompressor(io.BufferedIOBase):
 		return result
 	
 	def read(self, size: ty.Optional[int] = -1) -> bytes:
-		buf: bytearray = bytearray()
+		# Collect the chunks and join them once at the end, rather than growing
+		# a single buffer by repeated concatenation
+		chunks: ty.List[bytes] = []
 		if size is None or size < 0:
 			while len(data := self.read1()) > 0:
-				buf += data
+				chunks.append(data)
 		else:
-			while len(buf) < size and len(data := self.read1(size - len(buf))) > 0:
-				buf += data
-		return buf
+			total = 0
+			while total < size and len(data := self.read1(size - total)) > 0:
+				chunks.append(data)
+				total += len(data)
+		return b"".join(chunks)
 	
 	def readinto1(self, buf: cabc.Sequence[bytes]) -> int:
 		# Read another chunk if the buffer is currently empty
@@ -769,68 +927,105 @@ class Decompressor(io.BufferedIOBase):
 
 
 
-def print_vaults(obj, f):
-	if isinstance(obj, dict):
-		if "vault" in obj:
-			if obj["vault"] != "http://localhost":
-				print("---------------------------------------")
-				print("at:  ", f)
-				print("Maybe found a Metamask vault:\n")
-				print(obj["vault"])
-				print("\n---------------------------------------\n\n\n")
-		if "data" in obj and "salt" in obj:
-			print("---------------------------------------")
-			print("at:  ", f)
-			print("Found a Metamask vault:\n")
-			print(json.dumps(obj))
-			print("\n---------------------------------------\n\n\n")
-		for key in obj:
-			print_vaults(obj[key])
-	if isinstance(obj, str):
-		if ("'data'" in obj or '"data"' in obj) and ("'salt'" in obj or '"salt"' in obj):
-			print("---------------------------------------")
-			print("at:  ", f)
-			print("Probably found a Metamask vault:\n")
-			print(obj)
-			print("\n---------------------------------------\n\n\n")
+SNAPPY_FRAMED_DATA_MAGIC_BYTES = bytes.fromhex("ff060000734e61507059")  # ....sNaPpY
 
-def print_vaults_from_sqlite_file(f):
+# Vault snippets are found by looking for their "salt" key and then trying to
+# parse a JSON object from each `{` up to `_VAULT_LOOKBEHIND` bytes before it.
+# Objects reaching further than `_VAULT_LOOKAHEAD` bytes past the key are too
+# long to be Metamask vault data.
+_SALT_KEY_BYTES = b'"salt"'
+_VAULT_LOOKBEHIND = 10000
+_VAULT_LOOKAHEAD = 10000
+_JSON_DECODER = json.JSONDecoder()
+
+# Quoted "data"/"salt" keys inside a string that may contain a vault
+_DATA_KEY_RE = re.compile(r"[\"']data[\"']")
+_SALT_KEY_RE = re.compile(r"[\"']salt[\"']")
+
+
+def print_vault(f, heading, text):
+	print("---------------------------------------")
+	print("at:  ", f)
+	print(heading + "\n")
+	print(text)
+	print("\n---------------------------------------\n\n\n")
+
+
+def find_vaults(root):
+	# Walk the object tree with an explicit stack rather than recursion, as
+	# deeply nested values would otherwise exhaust the Python call stack and
+	# back-references may make the tree cyclic
+	stack = [root]
+	seen = set()
+	while stack:
+		obj = stack.pop()
+		if isinstance(obj, (dict, list)):
+			if id(obj) in seen:
+				continue
+			seen.add(id(obj))
+			
+			if isinstance(obj, dict):
+				if "vault" in obj:
+					if obj["vault"] != "http://localhost":
+						yield "Maybe found a Metamask vault:", str(obj["vault"])
+				if "data" in obj and "salt" in obj:
+					yield "Found a Metamask vault:", json.dumps(obj)
+				children = list(obj.values())
+			else:
+				children = obj
+			
+			# Push in reverse so that children are visited in their original order
+			stack.extend(v for v in reversed(children) if isinstance(v, (dict, list, str)))
+		elif isinstance(obj, str):
+			if _DATA_KEY_RE.search(obj) and _SALT_KEY_RE.search(obj):
+				yield "Probably found a Metamask vault:", obj
+
+
+def find_vaults_in_sqlite_file(f):
+	results = []
 	try:
 		with sqlite3.connect("file:" + f + "?mode=ro&immutable=1", uri=True) as conn:
 			cur = conn.cursor()
 			cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='object_data'")
 			if len(cur.fetchall()) == 0:
-				return
-			cur.execute("SELECT * FROM object_data")
-			rows = cur.fetchall()
+				return results
+			# Let SQLite memory-map the database for the sequential scan below
+			conn.execute("PRAGMA mmap_size=268435456")
+			# Only fetch the (compressed) value column and stream the rows in
+			# batches, rather than loading the whole table into memory at once
+			cur.execute("SELECT data FROM object_data")
 			failures = 0
-			for row in rows:
-				try:
-					decompressed = snappy.decompress(row[4])
-				except AttributeError as ex:
-					failures += 1
-					if "'snappy' has no attribute" in str(ex):
-						print("Failed to use python-snappy. Is it installed?")
-						exit()
-						os._exit(0)
-					continue
-				except:
-					failures += 1
-					continue
-				
-				try:
-					reader = Reader(io.BufferedReader(io.BytesIO(decompressed)))
-					content = reader.read()
-				except:
-					failures += 1
-					continue
-				
-				print_vaults(content, f)
+			# Output buffer reused across rows, only grown when a row needs more
+			out = bytearray(4 * 1024 * 1024)
+			while len(batch := cur.fetchmany(512)) > 0:
+				for (blob,) in batch:
+					try:
+						length = cramjam.snappy.decompress_raw_len(blob)
+						if length > len(out):
+							out = bytearray(length)
+						length = cramjam.snappy.decompress_raw_into(blob, out)
+					except:
+						failures += 1
+						continue
+					
+					try:
+						reader = Reader(memoryview(out)[:length])
+						content = reader.read()
+					except:
+						failures += 1
+						continue
+					
+					for heading, text in find_vaults(content):
+						results.append((f, heading, text))
 
 	except BaseException as ex:
 		pass
+	return results
 
-SNAPPY_FRAMED_DATA_MAGIC_BYTES = bytes.fromhex("ff060000734e61507059")  # ....sNaPpY
+
+def print_vaults_from_sqlite_file(f):
+	for result in find_vaults_in_sqlite_file(f):
+		print_vault(*result)
 
 
 def get_default_firefox_profile_paths():
@@ -910,80 +1105,172 @@ def get_default_firefox_profile_paths():
 	return sorted(profile_dirs)
 
 
+def _map_files(func, paths):
+	"""Apply `func` to each of `paths`, spreading the work over all CPU cores
+	
+	Results are yielded in the same order as `paths`."""
+	if len(paths) < 2:
+		yield from map(func, paths)
+		return
+	
+	with concurrent.futures.ProcessPoolExecutor() as executor:
+		yield from executor.map(func, paths, chunksize=4)
+
+
 def scan_sqlite_files(base_path: pathlib.Path):
-	for f in base_path.rglob('*.sqlite'):
-		if not f.is_file():
-			continue
-		print_vaults_from_sqlite_file(str(f))
+	paths = [str(f) for f in base_path.rglob('*.sqlite') if f.is_file()]
+	for results in _map_files(find_vaults_in_sqlite_file, paths):
+		for result in results:
+			print_vault(*result)
 
 
-def scan_snappy_framed_files(base_path: pathlib.Path):
-	for f in base_path.rglob('*'):
-		if not f.is_file():
-			continue
+def find_vault_snippets(buf, start: int, stop: int):
+	"""Yield the `(begin, end)` offsets of the Metamask vault JSON objects in
+	`buf` whose "salt" key starts within `buf[start:stop]`
+	
+	Vaults may contain nested objects (such as "keyMetadata"), so candidates are
+	parsed with a real JSON decoder rather than matched by brace counting."""
+	if buf.find(_SALT_KEY_BYTES, start, stop + len(_SALT_KEY_BYTES) - 1) < 0:
+		return
+	
+	# Latin-1 maps each byte to exactly one character, so offsets into `text`
+	# correspond directly to offsets into `buf`
+	text = bytes(buf).decode("latin-1")
+	salt_key = _SALT_KEY_BYTES.decode("latin-1")
+	
+	# Result of parsing from each `{` offset (`None` if it is not valid JSON),
+	# as nearby keys often share the same candidates
+	parsed = {}
+	# No object containing any later key can start before this offset: every
+	# `{` before it was already found to be invalid or to end before it
+	floor = 0
+	
+	pos = text.find(salt_key, start, stop + len(salt_key) - 1)
+	while pos >= 0:
+		# Walk back over the `{` before the key, skipping objects that end
+		# before it, until reaching the innermost object that contains it –
+		# if the key belongs to a vault, that object is the vault
+		next_pos = pos + 1
+		brace = pos
+		while (brace := text.rfind("{", max(floor, pos - _VAULT_LOOKBEHIND), brace)) >= 0:
+			if brace not in parsed:
+				try:
+					parsed[brace] = _JSON_DECODER.raw_decode(text, brace)
+				except ValueError:
+					parsed[brace] = None
+			if parsed[brace] is None:
+				continue
+			
+			obj, end = parsed[brace]
+			if end <= pos:
+				continue
+			
+			if end <= pos + _VAULT_LOOKAHEAD and isinstance(obj, dict) \
+			   and 'data' in obj and 'salt' in obj:
+				yield brace, end
+				# Any other "salt" inside this vault is part of it
+				next_pos = end
+			break
+		else:
+			floor = pos
+		
+		pos = text.find(salt_key, next_pos, stop + len(salt_key) - 1)
+
+
+def find_vaults_in_snappy_framed_file(f):
+	results = []
+	
+	def scan(window, start: int, stop: int) -> int:
+		# Returns the offset from which later scans should continue
+		for begin, end in find_vault_snippets(window, start, stop):
+			snippet = window[begin:end]
+			results.append((f, "Found a Metamask vault:", snippet.decode("utf-8", errors="ignore")))
+			stop = max(stop, end)
+		return stop
+	
+	try:
+		with open(f, "rb") as ff:
+			d = Decompressor(ff)
+			
+			# Scan the data chunk by chunk as it is decompressed, so the whole
+			# file is never held in memory. A "salt" key is only looked at once
+			# the `_VAULT_LOOKAHEAD` bytes following it are available, and the
+			# `_VAULT_LOOKBEHIND` bytes before the first key not looked at yet
+			# are carried over, so the window always holds the largest possible
+			# vault snippet around each key.
+			carry = b""
+			scan_from = 0  # Offset in `carry` of the first key not looked at yet
+			while len(chunk := d.read1()) > 0:
+				window = carry + chunk
+				stop = len(window) - _VAULT_LOOKAHEAD
+				if stop > scan_from:
+					scan_from = scan(window, scan_from, stop)
+				
+				keep = max(0, scan_from - _VAULT_LOOKBEHIND)
+				carry = window[keep:]
+				scan_from -= keep
+			
+			# Whatever is left has no more data following it
+			scan(carry, scan_from, len(carry))
+	except Exception:
+		pass
+	return results
 
+
+def walk_scandir(root):
+	"""Recursively yield the `os.DirEntry` of every regular file below `root`
+	
+	Unlike `pathlib.Path.rglob` this reuses the file type and `stat` information
+	already returned while listing each directory. Symbolic links to
+	directories are not followed."""
+	stack = [root]
+	while stack:
 		try:
-			with open(f, "rb") as ff:
-				mb = ff.read(10)
+			with os.scandir(stack.pop()) as it:
+				for entry in it:
+					try:
+						if entry.is_dir(follow_symlinks=False):
+							stack.append(entry.path)
+						elif entry.is_file():
+							yield entry
+					except OSError:
+						continue
 		except OSError:
 			continue
 
-		if mb != SNAPPY_FRAMED_DATA_MAGIC_BYTES:
-			continue
 
+def has_snappy_framed_magic(path) -> bool:
+	try:
+		# Use the raw file descriptor API as only a few bytes are needed
+		fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+		try:
+			mb = os.read(fd, len(SNAPPY_FRAMED_DATA_MAGIC_BYTES))
+		finally:
+			os.close(fd)
+	except OSError:
+		return False
+	return mb == SNAPPY_FRAMED_DATA_MAGIC_BYTES
+
+
+def scan_snappy_framed_files(base_path: pathlib.Path):
+	candidates = []
+	for entry in walk_scandir(base_path):
 		try:
-			with open(f, "rb") as ff:
-				d = Decompressor(ff)
-				decoded = d.read()
-		except Exception:
+			if entry.stat().st_size < len(SNAPPY_FRAMED_DATA_MAGIC_BYTES):
+				continue
+		except OSError:
 			continue
+		candidates.append(entry.path)
 
-		decodedStr = decoded.decode(encoding='utf-8', errors="ignore")
-
-		pos = 0
-		stop = False
-		while not stop:
-			# If the file does not contain "salt":" it definitely doesn't contains Metamask vault data.
-			match = decodedStr.find('"salt":', pos)
-			if match == -1:
-				break
-
-			# Continue scanning 5000 characters before the first "salt":"
-			pos = max(pos, max(0, match - 5000))
-			match = decodedStr.find("{", pos)
-			if match == -1:
-				break
-
-			pos2 = pos
-			while True:
-				match2 = decodedStr.find("}", pos2)
-				if match2 == -1:
-					stop = True
-					break
-				if (match2 - match) > 10000:
-					# { .... } string is too long to be metamask vault data
-					pos = match2
-					stop = True
-					break
-				snippet = decodedStr[match:(match2+1)]
-
-				if "salt" not in snippet:
-					pos2 = match2 + 1
-				else:
-					try:
-						decodedSnippet = json.loads(snippet)
-						if 'data' in decodedSnippet and 'salt' in decodedSnippet:
-							print("---------------------------------------")
-							print("at:  ", f)
-							print("Found a Metamask vault:\n")
-							print(snippet)
-							print("\n---------------------------------------\n\n\n")
-						pos = match2
-						break
-					except:
-						#print("no decode")
-						pos2 = match2 + 1
-						continue
+	# Checking the magic bytes is almost entirely waiting on the disk, so
+	# overlap the reads using threads (which release the GIL while blocked)
+	with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
+		matches = executor.map(has_snappy_framed_magic, candidates)
+		paths = [path for path, match in zip(candidates, matches) if match]
+
+	for results in _map_files(find_vaults_in_snappy_framed_file, paths):
+		for result in results:
+			print_vault(*result)
 
 
 def scan_directory(base_path: pathlib.Path):
@@ -998,14 +1285,21 @@ def scan_directory(base_path: pathlib.Path):
 	scan_snappy_framed_files(base_path)
 
 
-if len(sys.argv) >= 2:
-	print_vaults_from_sqlite_file(sys.argv[1])
-else:
-	default_profiles = get_default_firefox_profile_paths()
-	if default_profiles:
-		for profile_path in default_profiles:
-			print(f"Scanning Firefox profile: {profile_path}")
-			scan_directory(profile_path)
+def main():
+	if len(sys.argv) >= 2:
+		print_vaults_from_sqlite_file(sys.argv[1])
 	else:
-		print("No default Firefox profile directories found. Scanning the current folder recursively...")
-		scan_directory(pathlib.Path('.'))
+		default_profiles = get_default_firefox_profile_paths()
+		if default_profiles:
+			for profile_path in default_profiles:
+				print(f"Scanning Firefox profile: {profile_path}")
+				scan_directory(profile_path)
+		else:
+			print("No default Firefox profile directories found. Scanning the current folder recursively...")
+			scan_directory(pathlib.Path('.'))
+
+
+# Guard the driver so that importing this module (including from the worker
+# processes started by `_map_files`) does not run a scan
+if __name__ == "__main__":
+	main()